@@ -207,9 +207,89 @@ class HashEntry:
         self.key = key
         self.value = value
 
-        # Set this value to True when you "delete" a HashEntry
-        self.is_tombstone = False
+    def __str__(self) -> str:
+        """Override string method to provide more readable output."""
+        return f"K: {self.key} V: {self.value}"
+
+
+# -------- Dict backed HashMap, same interface as SC & OA  -------- #
+
+class DictHashMap:
+    """
+    HashMap with the same interface as the SC and OA HashMaps
+    that stores its key:value pairs in a built-in dict.
+    Capacity only tracks the load factor, doubling when the size exceeds it;
+    the dict manages its own storage.
+    """
+
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1) -> None:
+        """Initialize new HashMap backed by a built-in dict."""
+        self._store = {}
+        self._capacity = max(capacity, 1)
+        self._hash_function = function
 
     def __str__(self) -> str:
         """Override string method to provide more readable output."""
-        return f"K: {self.key} V: {self.value} TS: {self.is_tombstone}"
+        return str(self._store)
+
+    def get_size(self) -> int:
+        """Return size of map."""
+        return len(self._store)
+
+    def get_capacity(self) -> int:
+        """Return capacity of map."""
+        return self._capacity
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Add a key:value pair to the hash map, overwriting the value of an existing key.
+        Doubles the capacity if the load factor would exceed 1.
+        """
+        store = self._store
+        store[key] = value
+        if len(store) > self._capacity:
+            self._capacity *= 2
+
+    def resize_table(self, new_capacity: int) -> None:
+        """Record the new capacity if it can hold all existing key:value pairs."""
+        if new_capacity < len(self._store):
+            return
+        self._capacity = max(new_capacity, 1)
+
+    def table_load(self) -> float:
+        """Return the current load factor for the hash map."""
+        return len(self._store) / self._capacity
+
+    def empty_buckets(self) -> int:
+        """Return the number of un-populated buckets in the hash map."""
+        return self._capacity - len(self._store)
+
+    def get(self, key: str) -> object:
+        """Return the value associated with the input key, or None if it is not present."""
+        return self._store.get(key)
+
+    def contains_key(self, key: str) -> bool:
+        """Returns whether the input key exists in the hash map."""
+        return key in self._store
+
+    def remove(self, key: str) -> None:
+        """Remove the input key and its associated value from the hash map if present."""
+        self._store.pop(key, None)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """Return a dynamic array populated with tuples of every key:value pair in the hash map."""
+        return DynamicArray(list(self._store.items()))
+
+    def clear(self) -> None:
+        """Clears all existing key:value pairs from the hash map."""
+        self._store.clear()
+
+    def __iter__(self):
+        """
+        Iterate over a HashEntry for every key:value pair in the hash map.
+        Entries are built on demand, so assigning to their value does not update the map.
+        """
+        for key, value in self._store.items():
+            yield HashEntry(key, value)
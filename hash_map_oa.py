@@ -1,66 +1,76 @@
 # Name: Mike Meller
 # Date: 12/7/23
-# Description: Implementation of a hash map data structure using a dynamic arrays and open adrressing with quadratic probing for collision resolution.
+# Description: Implementation of a hash map data structure using parallel hash, key and value arrays and open adrressing with perturbed probing over groups of buckets, filtered by per-bucket control bytes, for collision resolution.
 
-from da_and_sll import (DynamicArray, DynamicArrayException, HashEntry,
-                        hash_function_1, hash_function_2)
+from array import array
+
+from da_and_sll import (DictHashMap, DynamicArray, DynamicArrayException,
+                        HashEntry, hash_function_1, hash_function_2)
+
+# Control bytes kept for every bucket, a full bucket stores the low 7 bits of its hash
+_EMPTY = 0x80
+_DELETED = 0xFE
+
+# Control bytes are probed a group at a time as one 64 bit integer
+_GROUP_WIDTH = 8
+_LSBS = 0x0101010101010101
+_MSBS = 0x8080808080808080
+
+# Probing jumps between groups by steps perturbed by the higher hash bits, like
+# CPython's dict, to break up clusters from a weak hash function
+_PERTURB_SHIFT = 5
+
+# Probes needed to shift a 64 bit perturbation down to zero, after which
+# the perturbed steps visit every group of a power of two table
+_PERTURB_PROBES = 64 // _PERTURB_SHIFT + 1
+
+# Stored hashes are kept to 64 bits to fit the unsigned hash array
+_HASH_MASK = 0xFFFFFFFFFFFFFFFF
 
 
 class HashMap:
     def __init__(self, capacity: int, function) -> None:
         """
         Initialize new HashMap that uses
-        quadratic probing for collision resolution
+        perturbed probing over groups of buckets for collision resolution
         """
-        self._buckets = DynamicArray()
-
-        # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
-        for _ in range(self._capacity):
-            self._buckets.append(None)
+        # capacity must be a power of two so buckets can be found with a bitmask
+        self._capacity = 1 << max(3, (capacity - 1).bit_length())
+        self._mask = self._capacity - 1
+        self._create_buckets()
 
         self._hash_function = function
         self._size = 0
 
-    def __str__(self) -> str:
-        """
-        Override string method to provide more readable output
-        """
-        out = ''
-        for i in range(self._buckets.length()):
-            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
-        return out
-
-    def _next_prime(self, capacity: int) -> int:
+    def _create_buckets(self) -> None:
         """
-        Increment from given number to find the closest prime number
+        Create empty buckets for the current capacity.
+        Each bucket is split across parallel arrays of control bytes, hashes, keys and values
+        so probing only touches the values of a matching key.
         """
-        if capacity % 2 == 0:
-            capacity += 1
 
-        while not self._is_prime(capacity):
-            capacity += 2
+        # One control byte per bucket, the first group is mirrored past the end
+        # so a group starting near the end of the table is still a single slice
+        self._meta = bytearray([_EMPTY]) * (self._capacity + _GROUP_WIDTH)
+        self._hashes = array('Q', [0]) * self._capacity
+        self._keys = [None] * self._capacity
+        self._values = [None] * self._capacity
+        self._deleted = 0
 
-        return capacity
-
-    @staticmethod
-    def _is_prime(capacity: int) -> bool:
+    def __str__(self) -> str:
         """
-        Determine if given integer is a prime number and return boolean
+        Override string method to provide more readable output
         """
-        if capacity == 2 or capacity == 3:
-            return True
-
-        if capacity == 1 or capacity % 2 == 0:
-            return False
-
-        factor = 3
-        while factor ** 2 <= capacity:
-            if capacity % factor == 0:
-                return False
-            factor += 2
-
-        return True
+        out = ''
+        for i in range(self._capacity):
+            if self._meta[i] == _DELETED:
+                bucket = 'TS'
+            elif self._meta[i] == _EMPTY:
+                bucket = 'None'
+            else:
+                bucket = str(HashEntry(self._keys[i], self._values[i]))
+            out += str(i) + ': ' + bucket + '\n'
+        return out
 
     def get_size(self) -> int:
         """
@@ -74,14 +84,72 @@ class HashMap:
         """
         return self._capacity
 
-    def _hash(self, key: str) -> int:
+    def _hash(self, key: str) -> tuple[int, int]:
         '''
-        Return the output of applying a hash function to a key.
-        Output is scaled based on the current number of buckets in the hashmap.
+        Return the output of applying a hash function to a key,
+        followed by its low 7 bits which are stored as the control byte of the key's bucket.
+        The output is scaled to the current number of buckets by the caller.
+        Kept for reference, the hash map methods compute the hash inline rather than calling this,
+        and pass it to _probe, which is the one extra call each operation makes.
         '''
 
-        return self._hash_function(key) % self._capacity
-    
+        hash_val = self._hash_function(key) & _HASH_MASK
+        return hash_val, hash_val & 0x7F
+
+    def _set_meta(self, index: int, control: int) -> None:
+        """
+        Set the control byte of a bucket, keeping the mirrored first group in sync.
+        """
+        self._meta[index] = control
+        if index < _GROUP_WIDTH:
+            self._meta[self._capacity + index] = control
+
+    def _probe(self, key: str, hash_val: int) -> tuple[int, int]:
+        """
+        Follow the probe sequence of a key a group of control bytes at a time.
+        Return the bucket holding the key, or -1 if it is not present,
+        followed by the first empty or deleted bucket passed on the way, or -1 if there was none.
+        """
+        meta, keys, mask, capacity = self._meta, self._keys, self._mask, self._capacity
+        pattern = (hash_val & 0x7F) * _LSBS
+        group, perturb = hash_val & mask, hash_val
+        free_bucket = -1
+
+        # Iterate through the array a group of control bytes at a time with perturbed probing with wrap around
+        # Only groups with a control byte matching the hash have their keys compared
+        # Remember the first empty or deleted bucket but keep looking for the key
+        # If the group has an empty bucket, key is not present
+        for _ in range(_PERTURB_PROBES + self._capacity // _GROUP_WIDTH):
+            word = int.from_bytes(meta[group:group + _GROUP_WIDTH], 'little')
+
+            # Bytes equal to h7 become zero, flag them in their high bit
+            # If any are flagged, look for the key among the group's keys in one pass,
+            # a weak hash function can leave many buckets of a group with the same h7
+            x = word ^ pattern
+            if (x - _LSBS) & ~x & _MSBS:
+                if group + _GROUP_WIDTH <= capacity:
+                    window = keys[group:group + _GROUP_WIDTH]
+                else:
+                    window = keys[group:] + keys[:group + _GROUP_WIDTH - capacity]
+                if key in window:
+                    return (group + window.index(key)) & mask, free_bucket
+
+            # Empty and deleted control bytes are the only ones with the high bit set
+            # The lowest flagged bit of a mask m is in byte ((m & -m).bit_length() >> 3) - 1
+            if free_bucket < 0:
+                free = word & _MSBS
+                if free:
+                    free_bucket = (group + ((free & -free).bit_length() >> 3) - 1) & mask
+
+            # Only empty control bytes have the high bit set and bit 1 clear
+            if word & ~(word << 6) & _MSBS:
+                break
+
+            group = ((group // _GROUP_WIDTH * 5 + 1 + perturb) * _GROUP_WIDTH) & mask
+            perturb >>= _PERTURB_SHIFT
+
+        return -1, free_bucket
+
     def put(self, key: str, value: object) -> None:
         """
         Add a key:value pair to the hash map.
@@ -90,32 +158,27 @@ class HashMap:
         Return None.
         """
     
-        # Check if we need to resize
-        if self.table_load() >= 0.5:
+        # Check if we need to resize, same as table_load() >= 0.5 without the division
+        # Deleted buckets also end probes late, so once they fill the table rehash at the same capacity to clear them
+        if self._size * 2 >= self._capacity:
             self.resize_table(self._capacity * 2)
+        elif (self._size + self._deleted) * 2 >= self._capacity:
+            self.resize_table(self._capacity)
 
-        # Find where to insert the new key value pair
-        target_bucket = self._hash(key)    
-        probe = 0
-
-        # Iterate through the array with quadratic probing with wrap around
-        # If we find a tombstone, take its place
         # If we find the key, replace its value
-        # If we find an empty spot, insert new HashEntry there
-        while self._buckets[target_bucket]:
-            if self._buckets[target_bucket].is_tombstone:
-                self._buckets[target_bucket] = HashEntry(key, value)
-                self._size += 1
-                return
-            if self._buckets[target_bucket].key == key:
-                self._buckets[target_bucket].value = value
-                return
-
-            target_bucket += (probe + 1)**2 - probe**2
-            target_bucket %= self._capacity
-            probe += 1
-
-        self._buckets[target_bucket] = HashEntry(key, value)
+        # Otherwise insert it in the first empty or deleted bucket of its probe sequence
+        hash_val = self._hash_function(key) & _HASH_MASK
+        target_bucket, free_bucket = self._probe(key, hash_val)
+        if target_bucket >= 0:
+            self._values[target_bucket] = value
+            return
+
+        if self._meta[free_bucket] == _DELETED:
+            self._deleted -= 1
+        self._hashes[free_bucket] = hash_val
+        self._keys[free_bucket] = key
+        self._values[free_bucket] = value
+        self._set_meta(free_bucket, hash_val & 0x7F)
         self._size += 1
 
 
@@ -123,7 +186,7 @@ class HashMap:
         """
         Change the capacity of the hash map and re-populate with all existing key:value pairs.
         The supplied capacity must exceed 1.
-        If supplied capacity is not prime, instead use next nearest prime.
+        If supplied capacity is not a power of two, instead use the next power of two.
         Returns None.
         """
         
@@ -132,26 +195,44 @@ class HashMap:
             return
         
         # Hold the old hash map
-        old_map = self._buckets
+        old_meta, old_hashes = self._meta, self._hashes
+        old_keys, old_values = self._keys, self._values
         old_capacity = self._capacity
 
-        # New capacity should be prime
-        if not self._is_prime(new_capacity):
-            self._capacity = self._next_prime(new_capacity)
-        else:
-            self._capacity = new_capacity
+        # New capacity should be a power of two
+        self._capacity = 1 << max(3, (new_capacity - 1).bit_length())
+        self._mask = self._capacity - 1
 
         # Create the new hash map
-        self._buckets = DynamicArray()
-        for _ in range(self._capacity):
-            self._buckets.append(None)
-        self._size = 0
+        self._create_buckets()
 
         # Iterate through the old hash map moving all values to the new hash map
+        # Keys are already unique and their hashes are stored, so they skip the work done by put
         for index in range(old_capacity):
-            curr = old_map[index]
-            if curr and not curr.is_tombstone:
-                self.put(curr.key, curr.value )
+            if old_meta[index] < _EMPTY:
+                self._insert_fresh(old_keys[index], old_values[index], old_hashes[index])
+
+    def _insert_fresh(self, key: str, value: object, hash_val: int) -> None:
+        """
+        Insert a key:value pair known to be absent into the first empty bucket of its probe sequence.
+        Used when re-populating a new table, which holds no deleted buckets and has room for the pair.
+        Does not change the size of the hash map.
+        """
+        meta, mask = self._meta, self._mask
+        group, perturb = hash_val & mask, hash_val
+
+        # Without deleted buckets every control byte with the high bit set is empty
+        free = int.from_bytes(meta[group:group + _GROUP_WIDTH], 'little') & _MSBS
+        while not free:
+            group = ((group // _GROUP_WIDTH * 5 + 1 + perturb) * _GROUP_WIDTH) & mask
+            perturb >>= _PERTURB_SHIFT
+            free = int.from_bytes(meta[group:group + _GROUP_WIDTH], 'little') & _MSBS
+
+        target_bucket = (group + ((free & -free).bit_length() >> 3) - 1) & mask
+        self._hashes[target_bucket] = hash_val
+        self._keys[target_bucket] = key
+        self._values[target_bucket] = value
+        self._set_meta(target_bucket, hash_val & 0x7F)
 
 
     def table_load(self) -> float:
@@ -176,22 +257,10 @@ class HashMap:
         if self._size == 0:
             return
 
-        # Find what bucket key should be in
-        target_bucket = self._hash(key)
-        probe = 0
-
-        # Iterate through the array with quadratic probing with wrap around
-        # If we find a tombstone, keep going
-        # If we find the key, return its value
-        # If we find an empty spot, key is not present
-        while self._buckets[target_bucket]:
-            curr = self._buckets[target_bucket]
-            if curr.key == key and not curr.is_tombstone:
-                return curr.value
-
-            target_bucket += (probe + 1)**2 - probe**2
-            target_bucket %= self._capacity
-            probe += 1
+        # If the key's probe sequence holds the key, return its value
+        target_bucket, _ = self._probe(key, self._hash_function(key) & _HASH_MASK)
+        if target_bucket >= 0:
+            return self._values[target_bucket]
 
 
     def contains_key(self, key: str) -> bool:
@@ -203,24 +272,8 @@ class HashMap:
         if self._size == 0:
             return False
 
-        # Find what bucket key should be in
-        target_bucket = self._hash(key)
-        probe = 0
-
-       # Iterate through the array with quadratic probing with wrap around
-        # If we find a tombstone, keep going
-        # If we find the key, return True
-        # If we find an empty spot, return False
-        while self._buckets[target_bucket]:
-            curr = self._buckets[target_bucket]
-            if curr.key == key and not curr.is_tombstone:
-                return True
-
-            target_bucket += (probe + 1)**2 - probe**2
-            target_bucket %= self._capacity
-            probe += 1
-
-        return False
+        target_bucket, _ = self._probe(key, self._hash_function(key) & _HASH_MASK)
+        return target_bucket >= 0
 
     def remove(self, key: str) -> None:
         """
@@ -229,69 +282,42 @@ class HashMap:
         Return None.
         """
 
-        # Find what bucket key should be in and remove it
-        target_bucket = self._hash(key)
-        probe = 0
-
-        # Iterate through the array with quadratic probing with wrap around
-        # If we find our key and its not a tombstone, turn it into a tombstone.
-        while self._buckets[target_bucket]:
-            curr = self._buckets[target_bucket]
-            if curr.key == key and not curr.is_tombstone:
-                curr.is_tombstone = True
-                self._size -= 1
-                return
-
-            target_bucket += (probe + 1)**2 - probe**2
-            target_bucket %= self._capacity
-            probe += 1
+        # If we find our key, empty its bucket and mark it as deleted.
+        target_bucket, _ = self._probe(key, self._hash_function(key) & _HASH_MASK)
+        if target_bucket >= 0:
+            self._keys[target_bucket] = None
+            self._values[target_bucket] = None
+            self._set_meta(target_bucket, _DELETED)
+            self._size -= 1
+            self._deleted += 1
 
     def get_keys_and_values(self) -> DynamicArray:
         """
         Return a dynamic array populated with tuples of every key:value pair in the hash map.
         """
 
-        # Create an array
-        return_arr = DynamicArray()
-
-        # Iterate through the hash map adding all key:value pairs to the dynamic array
-        for index in range(self._capacity):
-            curr = self._buckets[index]
-            if curr and not curr.is_tombstone:
-                return_arr.append((curr.key, curr.value))
-        
-        return return_arr
+        # Collect all key:value pairs of full buckets and build the dynamic array in one step
+        meta, keys, values = self._meta, self._keys, self._values
+        return DynamicArray([(keys[index], values[index])
+                             for index in range(self._capacity) if meta[index] < _EMPTY])
 
     def clear(self) -> None:
         """
         Clears all existing key:value pairs from the hash map.
         """
-        self._buckets = DynamicArray()
-        for _ in range(self._capacity):
-            self._buckets.append(None)
+        self._create_buckets()
         self._size = 0
 
 
     def __iter__(self):
         """
-        Create an iterator for the hashmap.
-        """
-        self._index = 0
-        return self
-
-    def __next__(self):
+        Iterate over a HashEntry for every key:value pair in the hash map.
+        Entries are built on demand from the key and value arrays, so assigning
+        to an entry's value does not update the map, use put instead.
+        Each iteration keeps its own position, so several can run at once.
         """
-        Return the next HashEntry that is not a tombstone and advance iterator.
-        """
-
-        # Keep searching while the index is valid by advancing iterator
-        # If we find a non-tombstone HashEntry, advance iterator and return the entry.
-        while self._index < self._buckets.length():
-            val = self._buckets[self._index]
-            if val and not val.is_tombstone:
-                self._index += 1
-                return val
-            self._index += 1
+        meta, keys, values = self._meta, self._keys, self._values
+        for index in range(self._capacity):
+            if meta[index] < _EMPTY:
+                yield HashEntry(keys[index], values[index])
 
-        # If index goes out of bounds, stop iterating
-        raise StopIteration
@@ -1,10 +1,23 @@
 # Name: Mike Meller
 # Date: 12/7/23
-# Description: Implementation of a hash map data structure using dynamic arrays and singly linked lists with chaining for collision resolution.
+# Description: Implementation of a hash map data structure using dynamic arrays and parallel hash, key and value lists with chaining for collision resolution.
 
-from da_and_sll import (DynamicArray, LinkedList,
+from da_and_sll import (DictHashMap, DynamicArray,
                         hash_function_1, hash_function_2)
 
+# NumPy is optional and only used by find_mode, so it is imported on first use
+# None until then, False if it is missing
+_numpy = None
+
+# Keeps the fast modulo intermediate product within 64 bits
+_FASTMOD_MASK = 0xFFFFFFFFFFFFFFFF
+
+# Roughly doubling primes used for capacity, entry i has a bit length of i + 4
+_PRIME_TABLE = (11, 23, 53, 97, 193, 389, 769, 1543, 3079, 6151, 12289, 24593,
+                49157, 98317, 196613, 393241, 786433, 1572869, 3145739, 6291469,
+                12582917, 25165843, 50331653, 100663319, 201326611, 402653189,
+                805306457, 1610612741)
+
 
 class HashMap:
     def __init__(self,
@@ -14,15 +27,14 @@ class HashMap:
         Initialize new HashMap that uses
         separate chaining for collision resolution
         """
-        self._buckets = DynamicArray()
-
         # capacity must be a prime number
         self._capacity = self._next_prime(capacity)
-        for _ in range(self._capacity):
-            self._buckets.append(LinkedList())
+        self._fastmod_M = (1 << 64) // self._capacity + 1
+        self._buckets = DynamicArray([([], [], []) for _ in range(self._capacity)])
 
         self._hash_function = function
         self._size = 0
+        self._empty_bucket_count = self._capacity
 
     def __str__(self) -> str:
         """
@@ -30,13 +42,23 @@ class HashMap:
         """
         out = ''
         for i in range(self._buckets.length()):
-            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
+            _, keys, values = self._buckets[i]
+            pairs = ', '.join('(' + str(key) + ': ' + str(value) + ')' for key, value in zip(keys, values))
+            out += str(i) + ': [' + pairs + ']\n'
         return out
 
     def _next_prime(self, capacity: int) -> int:
         """
-        Increment from given number and the find the closest prime number
+        Find the smallest prime in the prime table that is at least the given number.
+        Beyond the table, increment from given number to find the closest prime number
         """
+        if capacity <= _PRIME_TABLE[-1]:
+            # Bit length picks the entry directly, at most one step past it is needed
+            index = max(capacity.bit_length() - 4, 0)
+            if _PRIME_TABLE[index] < capacity:
+                index += 1
+            return _PRIME_TABLE[index]
+
         if capacity % 2 == 0:
             capacity += 1
 
@@ -56,10 +78,12 @@ class HashMap:
         if capacity == 1 or capacity % 2 == 0:
             return False
 
-        factor = 3
-        while factor ** 2 <= capacity:
+        # Track factor squared with additions, (f + 2)**2 = f**2 + 4f + 4
+        factor, square = 3, 9
+        while square <= capacity:
             if capacity % factor == 0:
                 return False
+            square += 4 * factor + 4
             factor += 2
 
         return True
@@ -79,10 +103,13 @@ class HashMap:
     def _hash(self, key: str) -> int:
         '''
         Return the output of applying a hash function to a key.
-        Output is scaled based on the current number of buckets in the hashmap.
+        Output is scaled based on the current number of buckets in the hashmap
+        using Lemire's fast modulo reduction instead of a division.
+        Kept for reference, the hash map methods compute this inline to avoid the extra call.
         '''
 
-        return self._hash_function(key) % self._capacity
+        lowbits = self._hash_function(key) * self._fastmod_M & _FASTMOD_MASK
+        return (lowbits * self._capacity) >> 64
 
     def put(self, key: str, value: object) -> None:
         """
@@ -92,27 +119,35 @@ class HashMap:
         Return None.
         """
 
-        # Check if we need to resize
-        if self.table_load() >= 1:
+        # Check if we need to resize, same as table_load() >= 1 without the division
+        if self._size >= self._capacity:
             self.resize_table(self._capacity * 2)
 
         # Find where to insert the new key value pair
-        target_bucket = self._hash(key)
+        # The full hash is stored with the key so mismatches are found with an integer compare
+        hash_val = self._hash_function(key)
+        lowbits = hash_val * self._fastmod_M & _FASTMOD_MASK
+        hashes, keys, values = self._buckets[(lowbits * self._capacity) >> 64]
 
         # Check if the key is already present, otherwise insert it
-        target_node =  self._buckets[target_bucket].contains(key)
-        if target_node:
-            target_node.value = value
-        else:
-            self._buckets[target_bucket].insert(key, value)
-            self._size += 1
+        for index, curr_hash in enumerate(hashes):
+            if curr_hash == hash_val and keys[index] == key:
+                values[index] = value
+                return
+
+        if not hashes:
+            self._empty_bucket_count -= 1
+        hashes.append(hash_val)
+        keys.append(key)
+        values.append(value)
+        self._size += 1
 
 
     def resize_table(self, new_capacity: int) -> None:
         """
         Change the capacity of the hash map and re-populate with all existing key:value pairs.
         The supplied capacity must exceed 1.
-        If supplied capacity is not prime, instead use next nearest prime.
+        Capacity is rounded up to the next prime in the prime table.
         Returns None.
         """
         
@@ -125,24 +160,28 @@ class HashMap:
         old_capacity = self._capacity
 
         # New capacity should be prime and result in table load <= 1
-        if not self._is_prime(new_capacity):
-            self._capacity = self._next_prime(new_capacity)
-        else:
-            self._capacity = new_capacity
-
-        while self.table_load() > 1:
-            self._capacity = self._next_prime(self._capacity * 2)
+        # so it only needs to reach the current size, found with a single prime lookup
+        self._capacity = self._next_prime(max(new_capacity, self._size))
+        self._fastmod_M = (1 << 64) // self._capacity + 1
 
         # Create the new hash map
-        self._buckets = DynamicArray()
-        for _ in range(self._capacity):
-            self._buckets.append(LinkedList())
-        self._size = 0
+        self._buckets = DynamicArray([([], [], []) for _ in range(self._capacity)])
 
         # Iterate through the old hash map moving all values to the new map
+        # Keys are already unique and their hashes are stored, so they are appended without going through put
+        buckets, fastmod_M, capacity = self._buckets, self._fastmod_M, self._capacity
+        empty_bucket_count = capacity
         for index in range(old_capacity):
-            for node in old_map[index]:
-                self.put(node.key, node.value)
+            hashes, keys, values = old_map[index]
+            for hash_val, key, value in zip(hashes, keys, values):
+                lowbits = hash_val * fastmod_M & _FASTMOD_MASK
+                new_hashes, new_keys, new_values = buckets[(lowbits * capacity) >> 64]
+                if not new_hashes:
+                    empty_bucket_count -= 1
+                new_hashes.append(hash_val)
+                new_keys.append(key)
+                new_values.append(value)
+        self._empty_bucket_count = empty_bucket_count
     
 
     def table_load(self) -> float:
@@ -155,13 +194,7 @@ class HashMap:
         """
         Return the number of un-populated buckets in the hash map.
         """
-        empty = 0
-
-        for index in range(self._capacity): 
-            if self._buckets[index].length() == 0:
-                empty +=1
-
-        return empty
+        return self._empty_bucket_count
                 
 
     def get(self, key: str) -> object:
@@ -174,13 +207,13 @@ class HashMap:
         if self._size == 0:
             return
 
-        # Find what bucket key should be in
-        target_bucket = self._hash(key)
-
-        # Check if the bucket contains the key, if so return value
-        target_node = self._buckets[target_bucket].contains(key)
-        if target_node:
-            return target_node.value
+        # Check if the bucket the key should be in contains it, if so return value
+        hash_val = self._hash_function(key)
+        lowbits = hash_val * self._fastmod_M & _FASTMOD_MASK
+        hashes, keys, values = self._buckets[(lowbits * self._capacity) >> 64]
+        for index, curr_hash in enumerate(hashes):
+            if curr_hash == hash_val and keys[index] == key:
+                return values[index]
 
 
     def contains_key(self, key: str) -> bool:
@@ -192,10 +225,13 @@ class HashMap:
         if self._size == 0:
             return False
         
-        # Find what bucket key should be in
-        target_bucket = self._hash(key)
-        if self._buckets[target_bucket].contains(key):
-            return True
+        # Check if the bucket the key should be in contains it
+        hash_val = self._hash_function(key)
+        lowbits = hash_val * self._fastmod_M & _FASTMOD_MASK
+        hashes, keys, _ = self._buckets[(lowbits * self._capacity) >> 64]
+        for index, curr_hash in enumerate(hashes):
+            if curr_hash == hash_val and keys[index] == key:
+                return True
         return False
 
     def remove(self, key: str) -> None:
@@ -206,41 +242,70 @@ class HashMap:
         """
 
         # Find what bucket key should be in and remove it
-        target_bucket = self._hash(key)
-        if self._buckets[target_bucket].remove(key):
-            self._size -= 1
+        hash_val = self._hash_function(key)
+        lowbits = hash_val * self._fastmod_M & _FASTMOD_MASK
+        hashes, keys, values = self._buckets[(lowbits * self._capacity) >> 64]
+        for index, curr_hash in enumerate(hashes):
+            if curr_hash == hash_val and keys[index] == key:
+                del hashes[index]
+                del keys[index]
+                del values[index]
+                self._size -= 1
+                if not hashes:
+                    self._empty_bucket_count += 1
+                return
 
     def get_keys_and_values(self) -> DynamicArray:
         """
         Return a dynamic array populated with tuples of every key:value pair in the hash map.
         """
 
-        # Create an array
-        return_arr = DynamicArray()
-
-        # Iterate through the hash map adding all key:value pairs to the dynamic array
+        # Collect all key:value pairs and build the dynamic array in one step
+        key_values = []
         for index in range(self._capacity):
-            for node in self._buckets[index]:
-                return_arr.append((node.key, node.value))
-        
-        return return_arr
+            _, keys, values = self._buckets[index]
+            key_values.extend(zip(keys, values))
+
+        return DynamicArray(key_values)
 
     def clear(self) -> None:
         """
         Clears all existing key:value pairs from the hash map.
         """
-        self._buckets = DynamicArray()
-        for _ in range(self._capacity):
-            self._buckets.append(LinkedList())
+        self._buckets = DynamicArray([([], [], []) for _ in range(self._capacity)])
         self._size = 0
+        self._empty_bucket_count = self._capacity
+
+
+def _load_numpy():
+    """
+    Return the NumPy module, or None if it is not installed.
+    Only the first call tries the import.
+    """
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
 
 
 def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
     """
     Returns a tuple containing a dynamic array of the mode(s) of the da followed by the frequency of the mode(s).
-    Utilizes a hash map for storing frequency of each value.
+    Uses NumPy's unique counts when available, which returns the modes in sorted order,
+    otherwise utilizes a hash map for storing frequency of each value, which returns them in no particular order.
     """
 
+    np = _load_numpy()
+    if np is not None and da.length() > 0:
+        arr = np.array([da[index] for index in range(da.length())], dtype=object)
+        vals, counts = np.unique(arr, return_counts=True)
+        most_freq = counts.max()
+        return (DynamicArray(vals[counts == most_freq].tolist()), int(most_freq))
+
     # Create and populate a hash map
     # Key is the dynamic array entry, value is the frequency
     map = HashMap()